@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import datetime
+import importlib.util
 import logging.config
 import os
 import shutil
@@ -17,6 +18,13 @@ if sys.version_info.major == 2:
     class FileNotFoundError(Exception):
         pass
 
+# Use the C++ protobuf runtime when it is installed; it must be selected before any _pb2 module is imported.
+try:
+    if importlib.util.find_spec('google.protobuf.pyext._message'):
+        os.environ.setdefault('PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION', 'cpp')
+except ImportError:
+    pass
+
 from .routerio.router import Router, ZMQHandler, IOHandler
 from . import aibsmw_messages_pb2 as messages
 from .routerio.ZRO import ZROHost, RemoteObjectService, ZROProxy, Heartbeat
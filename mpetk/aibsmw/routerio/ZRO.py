@@ -1,12 +1,16 @@
 #!/usr/bin/env python
 # -*- coding: latin-1 -*-
 
+import functools
 import logging
+import os
+import platform
 import socket
+import struct
 import sys
 import threading
+import time
 from abc import abstractmethod
-from datetime import datetime
 from inspect import signature
 
 import yaml
@@ -16,10 +20,43 @@ from zmq.eventloop import ioloop
 from zmq.eventloop.ioloop import PeriodicCallback
 from zmq.eventloop.zmqstream import ZMQStream
 
+from google.protobuf.internal import api_implementation
+
 from .. import aibsmw_messages_pb2 as messages
 
-import platform
-import os
+# Logged through a module logger: the module-level logging.info() would call basicConfig() at import time.
+if api_implementation.Type() == 'python':
+    logging.getLogger(__name__).info('protobuf is using the pure python implementation; ZRO message serialization will be slow.')
+
+# Use the libyaml bindings when they are available.  Request arguments are always loaded with a safe loader since
+# they come from the network; replies keep the full dumper/loader pair so python types like tuples round-trip.
+_YAML_SAFE_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+_YAML_SAFE_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+_YAML_REPLY_LOADER = getattr(yaml, 'CFullLoader', yaml.FullLoader)
+_YAML_REPLY_DUMPER = getattr(yaml, 'CDumper', yaml.Dumper)
+
+# Host and process identity used in every message header.  None of these change while the process is running.
+_HOSTNAME = socket.gethostname()
+_PROC = sys.argv[0] if sys.argv else ''
+
+
+@functools.lru_cache(maxsize=1)
+def _fqdn():
+    """
+    Resolves this host's fully qualified name on first use.  It is a DNS lookup, so it isn't done at import time.
+    """
+    return socket.getfqdn()
+
+
+@functools.lru_cache(maxsize=1)
+def _local_ip():
+    """
+    Resolves this host's IP on first use.  It is a DNS lookup, so it isn't done at import time.
+    """
+    try:
+        return socket.gethostbyname(_HOSTNAME)
+    except socket.gaierror:
+        return '127.0.0.1'
 
 
 class ZROServiceType(type):
@@ -39,6 +76,10 @@ class ZROServiceType(type):
 
 
 class ZROService(metaclass=ZROServiceType):
+    # Services that only register callbacks on an IOLoop provided by ZROHost set this so that ZROHost doesn't give
+    # them a thread.
+    runs_on_io_loop = False
+
     @abstractmethod
     def __init__(self, context, client):
         """
@@ -53,7 +94,7 @@ class ZROService(metaclass=ZROServiceType):
     def start(self):
         """
         standard entry function for the service.  this function is executed in a thread seperate from other
-        services
+        services unless runs_on_io_loop is set, in which case it must return once the service is attached to the IOLoop
         """
         raise NotImplementedError
 
@@ -68,25 +109,38 @@ class ZROService(metaclass=ZROServiceType):
     def child_services(self):
         return []
 
+    @property
+    def receive_socket(self):
+        """
+        Socket that ZROHost watches on an IOLoop of its own for this service.  Incoming messages are passed to
+        on_message.  None if the service doesn't receive messages.
+        """
+        return None
 
-def create_platfom_info_packet():
-    packet = messages.platform_info()
-    packet.start_time = datetime.now().timestamp()
+    def on_message(self, frames):
+        """
+        Called on the service's IOLoop thread with the frames of each message arriving on receive_socket.
+        :param frames: list of message frames
+        """
+        raise NotImplementedError
 
-    packet.header.host = socket.gethostname()
-    packet.header.process = sys.argv[0]
-    packet.header.timestamp = datetime.now().timestamp()
-    packet.header.message_id = packet.DESCRIPTOR.name
 
-    packet.python.build_number = platform.python_build()[0]
-    packet.python.build_date = platform.python_build()[1]
+@functools.lru_cache(maxsize=None)
+def _static_platform_info():
+    """
+    Collects the python and host details of the platform_info packet.  Several of the platform calls probe files or
+    spawn processes, and none of them change while the process is running, so they are only gathered once.
+    :return: platform_info with the python and host fields populated
+    """
+    packet = messages.platform_info()
+    packet.python.build_number, packet.python.build_date = platform.python_build()
     packet.python.compiler = platform.python_compiler()
     packet.python.branch = platform.python_branch()
     packet.python.implementation = platform.python_implementation()
     packet.python.revision = platform.python_revision()
     packet.python.version = platform.python_version()
     packet.python.exec_prefix = sys.exec_prefix
-    packet.python.is_conda = os.path.exists(f'sys.exec_prefix/conda-meta')
+    packet.python.is_conda = os.path.exists(os.path.join(sys.exec_prefix, 'conda-meta'))
 
     packet.host.machine = platform.machine()
     packet.host.node = platform.node()
@@ -101,7 +155,60 @@ def create_platfom_info_packet():
     return packet
 
 
+def create_platfom_info_packet():
+    packet = messages.platform_info()
+    packet.CopyFrom(_static_platform_info())
+    packet.start_time = time.time()
+
+    packet.header.host = _HOSTNAME
+    packet.header.process = _PROC
+    packet.header.timestamp = time.time()
+    packet.header.message_id = packet.DESCRIPTOR.name
+
+    return packet
+
+
+class StampedPacket(object):
+    """
+    Caches the serialized form of a message whose only changing field is header.timestamp.  The timestamp is a fixed
+    width float on the wire so a new value can be written over the cached bytes instead of re-serializing the message.
+    """
+    _TIMESTAMP_TAG = b'\x1d'  # message_header.timestamp: field 3, wire type 5 (fixed32)
+    _SENTINEL = struct.pack('<f', -1.2345e37)
+
+    def __init__(self, message, prefix=b''):
+        """
+        :param message: protobuf message with a message_header named header.  A copy is taken, so the caller's
+        message is left untouched and later changes to it are not sent.
+        :param prefix: bytes sent ahead of the serialized message in the same frame
+        """
+        self.message = type(message)()
+        self.message.CopyFrom(message)
+        self._prefix = prefix
+        self.message.header.timestamp = struct.unpack('<f', self._SENTINEL)[0]
+        serialized = self.message.SerializeToString()
+        marker = self._TIMESTAMP_TAG + self._SENTINEL
+        self._buffer = bytearray(prefix + serialized)
+        self._offset = len(prefix) + serialized.find(marker) + len(self._TIMESTAMP_TAG)
+        if serialized.count(marker) != 1:
+            logging.warning(f'Could not locate the timestamp in {message.DESCRIPTOR.name}; serializing on every send.')
+            self._offset = None
+
+    def stamp(self, timestamp):
+        """
+        Returns the prefix and serialized message with header.timestamp set to timestamp
+        :param timestamp: seconds since the epoch
+        :return: bytes
+        """
+        if self._offset is None:
+            self.message.header.timestamp = timestamp
+            return self._prefix + self.message.SerializeToString()
+        struct.pack_into('<f', self._buffer, self._offset, timestamp)
+        return bytes(self._buffer)
+
+
 class PlatformInfo(ZROService):
+    runs_on_io_loop = True
 
     def __init__(self, context, client, service_host=('*', 6006), io_loop=None):
         """
@@ -117,25 +224,30 @@ class PlatformInfo(ZROService):
         self._service_host = service_host
         self._client = client
         self._socket = self._context.socket(zmq.REP)
-        self._stream = ZMQStream(self._socket)
         self._socket.setsockopt(zmq.RCVTIMEO, 0)
         self._socket.bind(f'tcp://{self._service_host[0]}:{self._service_host[1]}')
 
         self.packet = create_platfom_info_packet()
 
+    @property
+    def receive_socket(self):
+        return self._socket
+
+    def on_message(self, frames):
+        """
+        Replies to any request with the platform info packet.
+        :param frames: request frames
+        """
+        self._socket.send(self.packet.SerializeToString())
+
     def start(self):
-        poller = zmq.Poller()
-        poller.register(self._socket, zmq.POLLIN)
-        while True:
-            polled = dict(poller.poll(100))
-            if self._socket in polled and polled[self._socket] == zmq.POLLIN:
-                packet = self._socket.recv()
-                self._socket.send(self.packet)
+        """
+        Requests are dispatched to on_message by ZROHost.  Nothing to start.
+        """
 
     def stop(self):
         """
-
-        :return:
+        Requests are dispatched to on_message by ZROHost.  Nothing to stop.
         """
 
 
@@ -143,6 +255,7 @@ class Heartbeat(ZROService):
     """
     ZROService that sends a heartbeat message on an interval (default = 1 second)
     """
+    runs_on_io_loop = True
 
     def __init__(self, context, client, interval=1000, router_host=('127.0.0.1', 3860), io_loop=None, message=None):
         """
@@ -161,9 +274,14 @@ class Heartbeat(ZROService):
         self.client = client
 
         self.publisher = self.context.socket(zmq.PUB)
+        self.publisher.setsockopt(zmq.SNDHWM, 1000)
+        self.publisher.setsockopt(zmq.LINGER, 0)
         self.publisher.connect(f'tcp://{router_host[0]}:{router_host[1]}')
         logging.info(f'publishing to: tcp://{router_host[0]}:{router_host[1]}')
         self.heartbeat_message = message or self.create_heartbeat_message()
+        # subscribers filter on the message_id topic, so it leads the frame
+        prefix = self.heartbeat_message.header.message_id.encode() + b' '
+        self._stamped_message = StampedPacket(self.heartbeat_message, prefix=prefix)
         self.callback_timer = PeriodicCallback(self.send_heartbeat, self.interval, io_loop=self.io_loop)
 
     def create_heartbeat_message(self):
@@ -172,10 +290,11 @@ class Heartbeat(ZROService):
         :return:  a remote_device_heartbeat object
         """
         heartbeat_message = messages.generic_heartbeat()
-        heartbeat_message.header.host = socket.getfqdn()
-        heartbeat_message.header.timestamp = datetime.now().timestamp()
+        heartbeat_message.header.host = _fqdn()
+        heartbeat_message.header.timestamp = time.time()
         heartbeat_message.header.message_id = heartbeat_message.DESCRIPTOR.name
-        heartbeat_message.header.process = sys.argv[0]
+        heartbeat_message.header.process = _PROC
+        heartbeat_message.start_time = time.time()
 
         return heartbeat_message
 
@@ -183,19 +302,20 @@ class Heartbeat(ZROService):
         """
         Called on an self.interval to generate a heartbeat message and publish it.
         """
-        self.heartbeat_message.header.timestamp = datetime.now().timestamp()
-        message = self.heartbeat_message.header.message_id.encode() + b' ' + self.heartbeat_message.SerializeToString()
-        self.publisher.send(message)
+        try:
+            self.publisher.send(self._stamped_message.stamp(time.time()), zmq.NOBLOCK)
+        except zmq.Again:
+            logging.debug('Heartbeat dropped; publisher queue is full')
 
     def start(self):
         """
-        Standard entry point for ZROHost Services.  Called in a separate thread.
+        Standard entry point for ZROHost Services.  Schedules the heartbeat on the ZROHost IOLoop, which doesn't
+        handle requests, so a slow remote call can't hold up heartbeats.
         :return:
         """
         self.stop()
         logging.info(f'Starting heartbeat at interval {self.interval}')
         self.callback_timer.start()
-        self.io_loop.start()
 
     def stop(self):
         """
@@ -207,6 +327,9 @@ class Heartbeat(ZROService):
 
 
 class RemoteObjectService(ZROService):
+    runs_on_io_loop = True
+    _REPLY_MESSAGE_ID = messages.remote_service_reply.DESCRIPTOR.name
+
     def __init__(self, context, client, service_host=('*', 6005), router_host=('127.0.0.1', 3860), io_loop=None,
                  heartbeat=True):
         """
@@ -225,29 +348,49 @@ class RemoteObjectService(ZROService):
         self._router_host = router_host
         self._client = client
         self._socket = self._context.socket(zmq.REP)
-        self._stream = ZMQStream(self._socket)
         self._socket.setsockopt(zmq.RCVTIMEO, 0)
         self._socket.bind(f'tcp://{self._service_host[0]}:{self._service_host[1]}')
-        self._platform_packet = create_platfom_info_packet()
+        self._platform_packet = StampedPacket(create_platfom_info_packet())
+        # requests are handled one at a time on this service's IOLoop, so one request and one reply message are reused
+        self._request = messages.remote_service_request()
+        self._reply_message = messages.remote_service_reply()
         self._heartbeat = self._create_heartbeat() if heartbeat else None
 
     @property
     def child_services(self):
         return [self._heartbeat] if self._heartbeat else []
 
+    @property
+    def receive_socket(self):
+        return self._socket
+
+    def on_message(self, frames):
+        """
+        Handles a remote_service_request arriving on this service's IOLoop, then drains any requests that queued up
+        behind it without going back through the poller.
+        :param frames: request frames
+        """
+        self._handle_request(frames[0])
+        while True:
+            try:
+                packet = self._socket.recv(zmq.NOBLOCK)
+            except zmq.Again:
+                break
+            self._handle_request(packet)
+
     def _create_heartbeat(self):
         """
 
         :return:
         """
         message = messages.remote_device_heartbeat()
-        message.header.host = socket.gethostname()
-        message.header.process = sys.argv[0]
+        message.header.host = _HOSTNAME
+        message.header.process = _PROC
         message.header.message_id = message.DESCRIPTOR.name
         message.device_name = self._client.__class__.__name__
-        message.ip_address = socket.gethostbyname(socket.gethostname())
+        message.ip_address = _local_ip()
         message.port = self._router_host[1]
-        message.start_time = datetime.now().timestamp()
+        message.start_time = time.time()
         return Heartbeat(self._context, self._client, message=message, io_loop=self._io_loop)
 
     def _handle_request(self, request):
@@ -262,14 +405,13 @@ class RemoteObjectService(ZROService):
             return
         self._process_command(message)
 
-    @staticmethod
-    def _parse_message(request):
+    def _parse_message(self, request):
         """
         parses a remove_service_request
         :param request: serialized remote_service_request object
-        :return: a remote_service_object
+        :return: a remote_service_object, valid until the next request is parsed
         """
-        message = messages.remote_service_request()
+        message = self._request
         message.ParseFromString(request)
         return message
 
@@ -283,18 +425,17 @@ class RemoteObjectService(ZROService):
 
         # TODO check hasattr(self, platform_info)
         if command.command_type == command.CMD_PLATFORM_INFO:
-            self._platform_packet.header.timestamp = datetime.now().timestamp()
-            self._socket.send(self._platform_packet.SerializeToString())
+            self._socket.send(self._platform_packet.stamp(time.time()))
             return
         if not hasattr(self._client, command.target):
             self._reply('No attribute on client', failed=True)
             # print(dir(self._client))
             return
 
-        args = yaml.load(command.args)
+        args = yaml.load(command.args, Loader=_YAML_SAFE_LOADER)
         if not args:
             args = ''
-        kwargs = yaml.load(command.kwargs)
+        kwargs = yaml.load(command.kwargs, Loader=_YAML_SAFE_LOADER)
         if not kwargs:
             kwargs = {}
         result = None
@@ -320,40 +461,33 @@ class RemoteObjectService(ZROService):
         :param result: string
         :param failed: True / False for success status
         """
+        reply = self._reply_message
+        reply.Clear()
         try:
-            reply = messages.remote_service_reply(reply=yaml.dump(result))
+            reply.reply = yaml.dump(result, Dumper=_YAML_REPLY_DUMPER)
         except TypeError:
             logging.exception('cant reply?')
             print(result)
             return
 
-        message_id = reply.DESCRIPTOR.name
-        reply.header.host = socket.gethostname()
-        reply.header.process = sys.argv[0]
-        reply.header.timestamp = datetime.now().timestamp()
-        reply.header.message_id = message_id
+        reply.header.host = _HOSTNAME
+        reply.header.process = _PROC
+        reply.header.timestamp = time.time()
+        reply.header.message_id = self._REPLY_MESSAGE_ID
         reply.call_result = reply.RESULT_PROCESSED
         self._socket.send(reply.SerializeToString())
 
     def start(self):
         """
-        Standard entry point for ZMQService
+        Standard entry point for ZMQService.  Requests are dispatched to on_message by ZROHost.
 
         """
-        poller = zmq.Poller()
-        poller.register(self._socket, zmq.POLLIN)
-        while True:
-            polled = dict(poller.poll(100))
-            if self._socket in polled and polled[self._socket] == zmq.POLLIN:
-                packet = self._socket.recv()
-                self._handle_request(packet)
 
     def stop(self):
         """
         Standard Exit point for ZMQService
         :return:
         """
-        pass
 
 
 class ZROHost(object):
@@ -365,12 +499,15 @@ class ZROHost(object):
         """
         Instantiate a ZROHost wrapper
         :param target: The object ZROService objects will refer to.
-        :param io_loop: If none, ZMQs IOLoop will be used.
+        :param io_loop: IOLoop for timer services like Heartbeat.  If none, a new IOLoop will be used.
         """
         self._context = context or zmq.Context()
         self._io_loop = io_loop or ioloop.IOLoop()
         self._target = target
         self.services = []
+        self._streams = {}
+        # the timer loop plus one loop per service that receives messages
+        self._io_loops = [self._io_loop]
 
     def add_service(self, service, *args, **kwargs):
         """
@@ -380,57 +517,93 @@ class ZROHost(object):
         :param kwargs: keyword arguments to pass to the service
         """
         new_service = service(self._context, self._target, io_loop=self._io_loop, *args, **kwargs)
-        self.services.append(new_service)
-        for child_service in new_service.child_services:
-            self.services.append(child_service)
+        for added_service in [new_service] + new_service.child_services:
+            self.services.append(added_service)
+            if added_service.receive_socket is not None:
+                # each receiving service gets its own loop so that a slow call on one can't stall the others or the
+                # heartbeat timers
+                service_loop = ioloop.IOLoop()
+                self._io_loops.append(service_loop)
+                self._streams[added_service] = ZMQStream(added_service.receive_socket, io_loop=service_loop)
 
     def start(self):
         """
-        Spawns each service added by add_service in a thread as a Daemon.
-        Each service is then started via a call to start() and joined.
+        Starts each service added by add_service and runs each IOLoop in its own daemon thread.  Messages for
+        services with a receive_socket are dispatched to their on_message handler by that service's IOLoop, so a
+        service handles one request at a time but never waits on another service.  Services that run on an IOLoop
+        are started in place; any other service is spawned in its own daemon thread.  All threads are then joined.
         """
         threads = []
         for service in self.services:
-            t = threading.Thread(target=service.start)
-            t.setDaemon(True)
-            threads.append(t)
+            if service in self._streams:
+                self._streams[service].on_recv(service.on_message)
+            if service.runs_on_io_loop:
+                service.start()
+            else:
+                threads.append(threading.Thread(target=service.start, daemon=True))
+        for loop in self._io_loops:
+            threads.append(threading.Thread(target=loop.start, daemon=True))
+
+        for t in threads:
             t.start()
-
-        [t.join() for t in threads]
+        for t in threads:
+            t.join()
 
     def stop(self):
         """
-        Halts services by calling the services stop() method.
+        Halts services by calling the services stop() method, then stops the IOLoops.
         """
         for service in self.services:
             service.stop()
+        for loop in self._io_loops:
+            loop.add_callback(self._stop_io_loop, loop)
+
+    def _stop_io_loop(self, loop):
+        """
+        Detaches the service streams on loop and stops it.  Runs on that loop's thread.
+        :param loop: the IOLoop to stop
+        """
+        for stream in self._streams.values():
+            if stream.io_loop is loop:
+                stream.stop_on_recv()
+        loop.stop()
 
 
 class ZROProxy(object):
     """
     Service used by client code to attach to the RemoteObjectService
     """
+    _REQUEST_MESSAGE_ID = messages.remote_service_request.DESCRIPTOR.name
 
-    def __init__(self, host=('127.0.0.1', '6001'), timeout=1.0):
+    def __init__(self, host=('127.0.0.1', '6001'), timeout=1.0, context=None):
         """
         Create connection to a remote object service
         :param host: (host, port) to connec to.  ('127.0.0.1', 6005)
         :param timeout: How long to wait on a request.  10 seconds
+        :param context: ZMQ Context to create the socket on.  Defaults to the process wide zmq.Context.instance().
+                        Each proxy owns its own socket, so proxies used from different threads can share a context.
         """
-        self.__context = zmq.Context()
+        self.__context = context or zmq.Context.instance()
         self.__timeout = timeout * 1000
         self.__host = host
         self.__socket = None
         self.setup_socket()
         self.__to_call = None
+        self.__request_message = messages.remote_service_request()
+        self.__reply_message = messages.remote_service_reply()
 
     def setup_socket(self):
         """
-        Called to create a fresh REQ socket.  It will get recreated in the event that a remote object
-        times out and doesn't send a RESP
+        Called to create a fresh REQ socket.  The socket is relaxed and correlated, so a request that times out does
+        not lock up the REQ state machine and a late reply to it is discarded.  It only gets recreated after a transport
+        error.
         """
+        if self.__socket is not None:
+            self.__socket.close()
         self.__socket = self.__context.socket(zmq.REQ)
         self.__socket.setsockopt(zmq.LINGER, 0)
+        self.__socket.setsockopt(zmq.REQ_RELAXED, 1)
+        self.__socket.setsockopt(zmq.REQ_CORRELATE, 1)
         self.__socket.setsockopt(zmq.SNDTIMEO, int(self.__timeout))
         self.__socket.setsockopt(zmq.RCVTIMEO, int(self.__timeout))
         self.__socket.connect(f'tcp://{self.__host[0]}:{self.__host[1]}')
@@ -458,9 +631,7 @@ class ZROProxy(object):
             return self.remote_get(name)
 
         self.__to_call = name
-        request = messages.remote_service_request()
-        request.target = name
-        request.command_type = request.CMD_CALLABLE
+        request = self.__new_request(name, messages.remote_service_request.CMD_CALLABLE)
         is_callable = self.send(request)
         if is_callable is None:
             return None
@@ -481,10 +652,9 @@ class ZROProxy(object):
         :param kwargs: method keyword arguments on remote callable
         :return:
         """
-        request = messages.remote_service_request(target=self.__to_call,
-                                                  command_type=messages.remote_service_request.CMD_RUN,
-                                                  args=yaml.safe_dump(args),
-                                                  kwargs=yaml.safe_dump(kwargs))
+        request = self.__new_request(self.__to_call, messages.remote_service_request.CMD_RUN)
+        request.args = yaml.dump(args, Dumper=_YAML_SAFE_DUMPER)
+        request.kwargs = yaml.dump(kwargs, Dumper=_YAML_SAFE_DUMPER)
         response = self.send(request)
         return response
 
@@ -495,13 +665,11 @@ class ZROProxy(object):
         :return:
         """
 
-        request = messages.remote_service_request()
-        request.target = self.__to_call
         if name == 'platform_info':
-            request.command_type = request.CMD_PLATFORM_INFO
+            request = self.__new_request(self.__to_call, messages.remote_service_request.CMD_PLATFORM_INFO)
             return self.send(request, message_type=messages.platform_info)
         else:
-            request.command_type = request.CMD_GET
+            request = self.__new_request(self.__to_call, messages.remote_service_request.CMD_GET)
             return self.send(request)
 
     def remote_set(self, name, value):
@@ -511,12 +679,23 @@ class ZROProxy(object):
         :param value: value to set
         :return:
         """
-        request = messages.remote_service_request()
-        request.target = name
-        request.command_type = request.CMD_SET
-        request.args = yaml.safe_dump(value)
+        request = self.__new_request(name, messages.remote_service_request.CMD_SET)
+        request.args = yaml.dump(value, Dumper=_YAML_SAFE_DUMPER)
         self.send(request)
 
+    def __new_request(self, target, command_type):
+        """
+        Clears and refills the proxy's reusable remote_service_request
+        :param target: name on the remote object
+        :param command_type: remote_service_request command type
+        :return: the request message
+        """
+        request = self.__request_message
+        request.Clear()
+        request.target = target
+        request.command_type = command_type
+        return request
+
     def __del__(self):
         """
         overrides __del__ to close the socket rather than delete the proxy object.
@@ -530,10 +709,11 @@ class ZROProxy(object):
         :param request:  remote_service_request()
         :return: the reply message
         """
-        request.header.host = socket.gethostname()
-        request.header.process = sys.argv[0]
-        request.header.timestamp = datetime.now().timestamp()
-        request.header.message_id = request.DESCRIPTOR.name
+        header = request.header
+        header.host = _HOSTNAME
+        header.process = _PROC
+        header.timestamp = time.time()
+        header.message_id = self._REQUEST_MESSAGE_ID
         self.__socket.send(request.SerializeToString())
         try:
             reply = self.receive(message_type=message_type)
@@ -550,6 +730,8 @@ class ZROProxy(object):
         try:
             packet = self.__socket.recv()
         except zmq.error.Again:
+            raise
+        except zmq.error.ZMQError:
             self.setup_socket()
             raise
         if message_type == messages.platform_info:
@@ -557,6 +739,6 @@ class ZROProxy(object):
             reply.ParseFromString(packet)
             return reply
         else:
-            reply = messages.remote_service_reply()
+            reply = self.__reply_message
             reply.ParseFromString(packet)
-            return yaml.load(reply.reply)
+            return yaml.load(reply.reply, Loader=_YAML_REPLY_LOADER)
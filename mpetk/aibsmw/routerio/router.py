@@ -51,7 +51,7 @@ class Router(object):
 
         self.keep_polling = True
         self.remote_devices = {}
-        self.registration = defaultdict(list)
+        self.registration = defaultdict(set)
         self.header_retention = 100
         self.message_headers = []
         self.clients = set()
@@ -60,9 +60,9 @@ class Router(object):
         # self.announce_router()
 
     def announce_router(self):
-        message_list = []
+        message_list = set()
         for client, topics in self.registration.items():
-            message_list.extend(topics)
+            message_list.update(topics)
 
         message = aibsmw_messages_pb2.router_alive()
         message_id = message.DESCRIPTOR.name
@@ -70,7 +70,7 @@ class Router(object):
         message.header.process = sys.argv[0]
         message.header.timestamp = datetime.now().timestamp()
         message.header.message_id = message_id
-        for topic in set(message_list):
+        for topic in message_list:
             message.append(topic)
         self._broadcast_socket.sendto(message.SerializeToString(), ('<broadcast>', self._broadcast_port))
 
@@ -106,10 +106,9 @@ class Router(object):
 ## Should we get rid of this??
     def generate_traffic_report(self):
         return
-        registered_clients = []
+        registered_clients = set()
         for k, v in self.registration.items():
-            registered_clients += v
-        registered_clients = list(set(registered_clients))
+            registered_clients |= v
         publishing_clients = list(set(header[0] for header in self.message_headers))
         dot = Digraph(comment=f'{socket.gethostname()} Traffic Report')
         for client in self.clients:
@@ -169,17 +168,15 @@ class Router(object):
             if message_id == b'register_for_message':
                 message = aibsmw_messages_pb2.register_for_message()
                 message.ParseFromString(serialized_message)
-                if client not in self.registration[message_id]:
-                    self.registration[message.message_id.encode()].append(client)
-                    self.log.info(f'{client} registered for {message.message_id.encode()}')
+                self.registration[message.message_id.encode()].add(client)
+                self.log.info(f'{client} registered for {message.message_id.encode()}')
                 for router in self._routers:
                     router.register_for_message(message.message_id)
 
             if message_id == b'deregister_for_message':
                 message = aibsmw_messages_pb2.deregister_for_message()
                 message.ParseFromString(serialized_message)
-                if client in self.registration[message_id]:
-                    self.registration[message_id].remove(client)
+                self.registration[message.message_id.encode()].discard(client)
                 for router in self._routers:
                     router.write([b'router', message_id, serialized_message])
 
@@ -370,9 +367,6 @@ class ZMQHandler(IOHandler):
 
         :return:
         """
-        import errno
-        poller = zmq.Poller()
-        poller.register(self._router, zmq.POLLIN)
         while self.keep_polling:
             try:
                 client, message_id, message = self._router.recv_multipart()
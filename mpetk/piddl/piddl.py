@@ -1,4 +1,5 @@
 import enum
+import functools
 import logging
 from sys import exit
 
@@ -11,39 +12,46 @@ class InstanceLocks(enum.Enum):
     DAEMON_LOCK = 2
 
 
+def _acquire_pid_file(clobber_stale):
+    try:
+        make_pid_file(clobber_stale=clobber_stale)
+    except PidFileAlreadyRunningError:
+        logging.warning('This application is already running.  Exiting.')
+        exit(2)
+    except PidFileStaleError:
+        logging.warning('A PID File for this application exists but appears stale.')
+        exit(1)
+
+
+def _acquire_daemon_lock(clobber_stale):
+    try:
+        make_socket()
+    except OSError:
+        logging.warning('This application is already running.  Exiting.')
+        exit(2)
+
+
+_ACQUIRE_LOCK = {
+    InstanceLocks.PID_FILE: _acquire_pid_file,
+    InstanceLocks.DAEMON_LOCK: _acquire_daemon_lock,
+}
+
+
 def one_instance(mode: InstanceLocks = InstanceLocks.PID_FILE, clobber_stale: bool = True):
     """
-    A decorator intended for main() so that an application won't start twice.
+    A decorator intended for main() so that an application won't start twice.  The lock is taken when the decorated
+    function is called, not when it is decorated.
     :param mode: An assortment of possible lock mechanisms
     :param clobber_stale: Whether or not to delete stale PID files [False]
     """
-    if mode == InstanceLocks.PID_FILE:
-        def decorator(function):
-            def inner_function(*args, **kwargs):
-                try:
-                    make_pid_file(clobber_stale=clobber_stale)
-                except PidFileAlreadyRunningError:
-                    logging.warning('This application is already running.  Exiting.')
-                    exit(2)
-                except PidFileStaleError:
-                    logging.warning('A PID File for this application exists but appears stale.')
-                    exit(1)
-                function(*args, **kwargs)
-
-            return inner_function
-
-        return decorator
-
-    elif mode == InstanceLocks.DAEMON_LOCK:
-        def decorator(function):
-            def inner_function(*args, **kwargs):
-                try:
-                    make_socket()
-                except OSError:
-                    logging.warning('This application is already running.  Exiting.')
-                    exit(2)
-                function(*args, **kwargs)
-
-            return inner_function
-
-        return decorator
+    acquire = _ACQUIRE_LOCK[mode]
+
+    def decorator(function):
+        @functools.wraps(function)
+        def inner_function(*args, **kwargs):
+            acquire(clobber_stale)
+            return function(*args, **kwargs)
+
+        return inner_function
+
+    return decorator
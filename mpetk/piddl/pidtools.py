@@ -1,17 +1,32 @@
+import functools
 import os
+import queue
 import sys
+import tempfile
+import threading
 
 import psutil
 import logging
 import atexit
 
-from watchdog.observers import Observer
-from watchdog.events import PatternMatchingEventHandler, FileCreatedEvent, EVENT_TYPE_CREATED
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from watchdog.observers import Observer
+
+# watchdog is imported lazily so that tools which only use PID files don't pay for its import
 
 DEFAULT_PID_DIR = "c:/ProgramData/AIBS_MPE/pids"
 DEFAULT_KF_DIR = "c:/ProgramData/AIBS_MPE/kfs"
+DEFAULT_KF_POLL_INTERVAL = 10.0
 
-kf_obs: Observer = None
+kf_obs: "Observer" = None
+kf_router = None
+kf_worker: threading.Thread = None
+_kf_worker_lock = threading.Lock()
+_kill_queue = queue.SimpleQueue()
+_ensured_dirs = set()
+_registered_files = set()
 
 
 class PidFileError(Exception):
@@ -26,31 +41,155 @@ class PidFileStaleError(PidFileError):
     pass
 
 
-class KillFilePmeh(PatternMatchingEventHandler):
+@functools.lru_cache(maxsize=None)
+def _kill_file_pmeh_class():
     """
-    Class to represent a patern matching event handler with callback support.
+    Builds the KillFilePmeh class on first use so watchdog is only imported when it is needed.
+    :return: the KillFilePmeh class
     """
-    def __init__(self, kill_cb=None, patterns=None, ignore_patterns=None, ignore_directories=False, case_sensitive=False):
+    from watchdog.events import FileSystemEventHandler, PatternMatchingEventHandler
+
+    class KillFilePmeh(PatternMatchingEventHandler):
         """
-        Overload of init from PatternMatchingEventHandler which adds a callback paramter (kill_cb)
+        Class to represent a patern matching event handler with callback support.
+        """
+        def __init__(self, kill_cb=None, kill_file=None, patterns=None, ignore_patterns=None,
+                     ignore_directories=False, case_sensitive=False):
+            """
+            Overload of init from PatternMatchingEventHandler which adds a callback paramter (kill_cb)
+            :param kill_cb: Callback function taking zero paramters
+            :param kill_file: Fully qualified path of the kill file.  If set, events for any other path are dropped
+            before pattern matching.
+            """
+            super(KillFilePmeh, self).__init__(patterns=patterns, ignore_patterns=ignore_patterns, ignore_directories=ignore_directories, case_sensitive=case_sensitive)
+            self.kcb = self._fire = kill_cb
+            self.kill_file = _path_key(kill_file) if kill_file else None
+
+        def dispatch(self, event):
+            """
+            Dispatches events for the kill file only.  Matching on the exact path skips the per-event fnmatch done by
+            PatternMatchingEventHandler.
+            :param event: Event details from watchdog
+            """
+            if self.kill_file is None:
+                super(KillFilePmeh, self).dispatch(event)
+            elif not event.is_directory and _path_key(event.src_path) == self.kill_file:
+                FileSystemEventHandler.dispatch(self, event)
+
+        def on_created(self, event):
+            """
+            Called when a pattern is matched successfully.  The callback is queued for the kill file worker thread so
+            the observer thread is never blocked by callback work.  The worker is started here if needed, since this
+            handler may be scheduled without register_kill_callback.
+            :param event: Event details from watchdog
+            """
+            _start_kill_worker()
+            _kill_queue.put(self._fire)
+
+    return KillFilePmeh
+
+
+def __getattr__(name):
+    # KillFilePmeh is created lazily; see _kill_file_pmeh_class
+    if name == "KillFilePmeh":
+        return _kill_file_pmeh_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class KillFileRouter(object):
+    """
+    Single event handler shared by every registered kill file.  Events are routed to callbacks by exact path.
+    Observers only ever call dispatch(), so this doesn't need to derive from a watchdog handler class.
+    """
+    def __init__(self):
+        self.callbacks = {}
+
+    def add_callback(self, kill_file: str, kill_cb):
+        """
+        Registers a callback for a kill file.
+        :param kill_file: Fully qualified path of the kill file
         :param kill_cb: Callback function taking zero paramters
         """
-        super(KillFilePmeh, self).__init__(patterns=patterns, ignore_patterns=ignore_patterns, ignore_directories=ignore_directories, case_sensitive=case_sensitive)
-        self.kcb = kill_cb
+        self.callbacks.setdefault(_path_key(kill_file), []).append(kill_cb)
 
-    def on_created(self, event):
+    def dispatch(self, event):
         """
-        Called when a pattern is matched successfully.
+        Queues the callbacks registered for a created file on the kill file worker thread.
         :param event: Event details from watchdog
         """
-        if event.event_type == EVENT_TYPE_CREATED:
-            # execute callback
-            self.kcb()
+        if event.event_type != "created" or event.is_directory:
+            return
+        for kill_cb in self.callbacks.get(_path_key(event.src_path), ()):
+            _kill_queue.put(kill_cb)
+
+
+def _path_key(path: str) -> str:
+    """
+    Normalizes a path so that different spellings of the same file compare equal.
+    """
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _env_kf_poll_interval() -> float:
+    """
+    Reads the kill file poll interval from MPE_KF_POLL_INTERVAL.  A missing or unparsable value falls back to
+    DEFAULT_KF_POLL_INTERVAL.
+    """
+    value = os.getenv("MPE_KF_POLL_INTERVAL")
+    if value is None:
+        return DEFAULT_KF_POLL_INTERVAL
+    try:
+        return float(value)
+    except ValueError:
+        logging.warning(f"Ignoring MPE_KF_POLL_INTERVAL={value!r}; using {DEFAULT_KF_POLL_INTERVAL} seconds")
+        return DEFAULT_KF_POLL_INTERVAL
+
+
+def _run_kill_callbacks():
+    """
+    Worker loop that executes queued kill file callbacks.
+    """
+    while True:
+        callback = _kill_queue.get()
+        try:
+            callback()
+        except Exception:
+            logging.exception("Error in kill file callback")
+
+
+def _start_kill_worker():
+    """
+    Starts the kill file worker thread if it isn't already running.
+    """
+    global kf_worker
+    if kf_worker:
+        return
+    with _kf_worker_lock:
+        if not kf_worker:
+            kf_worker = threading.Thread(target=_run_kill_callbacks, name="kill_file_worker", daemon=True)
+            kf_worker.start()
 
 
 # NOTE:  we want to check the behavior of these functions with subprocesses
 
 
+def ensure_dir(path: str):
+    """
+    Creates a directory if it does not exist.  Directories that have already been ensured by this process are skipped.
+    :param path: The directory to create
+    :raises: PidFileError if there is a failure to create the directory
+    """
+    key = _path_key(path)
+    if key in _ensured_dirs:
+        return
+    try:
+        os.makedirs(path, exist_ok=True)
+    except Exception as e:
+        raise PidFileError(str(e))
+    _ensured_dirs.add(key)
+
+
+@functools.lru_cache(maxsize=None)
 def pid_filename(pid_name: str = None, pid_dir: str = None) -> str:
     """
     Generates a reproducible PID Filename.  If the PID_DIR does not exist, it will be created.
@@ -64,14 +203,12 @@ def pid_filename(pid_name: str = None, pid_dir: str = None) -> str:
         pid_name = f"{pid_name}.pid"
 
     pid_dir = pid_dir or DEFAULT_PID_DIR
-    try:
-        os.makedirs(pid_dir, exist_ok=True)
-    except Exception as e:
-        raise PidFileError(str(e))
+    ensure_dir(pid_dir)
 
-    return f"{pid_dir}/{pid_name}"
+    return os.path.normpath(os.path.join(pid_dir, pid_name))
 
 
+@functools.lru_cache(maxsize=None)
 def kill_filename(app_name: str = None) -> str:
     """
     Generates a reproducible Kill Filename.
@@ -91,23 +228,38 @@ def make_pid_file(pid_name: str = None, pid_dir: str = None, clobber_stale: bool
     :raises PidFileStaleError if there is a stale file and clobber_stale = False
     """
     filename = pid_filename(pid_name, pid_dir)
-    if os.path.exists(filename):
+    try:
+        fd = os.open(filename, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    except FileExistsError:
         try:
             check_for_process(filename)
-        except PidFileAlreadyRunningError:
-            raise
         except PidFileStaleError:
-            if clobber_stale:
-                os.unlink(filename)
-                with open(filename, "x") as f:
-                    f.write(str(os.getpid()))
-            else:
-                raise PidFileStaleError
+            if not clobber_stale:
+                raise
+        replace_pid_file(filename)
     else:
-        with open(filename, "x") as f:
-            f.write(str(os.getpid()))
+        try:
+            os.write(fd, b"%d" % os.getpid())
+        finally:
+            os.close(fd)
+
+    register_xid_file(filename)
 
-    atexit.register(atexit_handler, filename)
+
+def replace_pid_file(filename: str):
+    """
+    Atomically replaces the contents of a PID file with the current PID.  The new file is written next to the old one
+    and moved into place so there is never a moment where the PID file is missing.
+    :param filename: Path to the PID File
+    """
+    fd, tmp_filename = tempfile.mkstemp(dir=os.path.dirname(filename) or None, suffix=".tmp")
+    try:
+        os.write(fd, b"%d" % os.getpid())
+    finally:
+        os.close(fd)
+    # mkstemp creates the file 0o600; match the permissions make_pid_file gives a new PID file
+    os.chmod(tmp_filename, 0o644)
+    os.replace(tmp_filename, filename)
 
 
 def make_kill_file(app_name: str = None):
@@ -117,10 +269,7 @@ def make_kill_file(app_name: str = None):
     :param app_name: The name of the application the kill file is to represent
     """
     # ensure base kf directory exists
-    try:
-        os.makedirs(DEFAULT_KF_DIR, exist_ok=True)
-    except Exception as e:
-        raise PidFileError(str(e))
+    ensure_dir(DEFAULT_KF_DIR)
 
     kill_file_name = os.path.join(DEFAULT_KF_DIR, kill_filename(app_name))
 
@@ -130,7 +279,7 @@ def make_kill_file(app_name: str = None):
         with open(kill_file_name, "x") as f:
             f.write(str(os.getpid()))
 
-    atexit.register(atexit_handler, kill_file_name)
+    register_xid_file(kill_file_name)
 
 
 def delete_kill_file(app_name: str = None):
@@ -141,25 +290,38 @@ def delete_kill_file(app_name: str = None):
     remove_xid_file(os.path.join(DEFAULT_KF_DIR, kill_filename(app_name)))
 
 
-def register_kill_callback(callback, app_name: str = None):
+def register_kill_callback(callback, app_name: str = None, poll_interval: float = None, force_polling: bool = False):
     """
     Registers a callback function to be called when the kill file is created.
+    The native observer (ReadDirectoryChangesW on Windows, inotify on Linux) is used unless force_polling is set.  The
+    observer is shared, so poll_interval and force_polling only take effect on the first registration.
     :param callback: Callback function to call. This function has no parameters.
     :param app_name: The name of the application the kill file is to represent
+    :param poll_interval: Seconds between directory scans when polling [MPE_KF_POLL_INTERVAL or 10]
+    :param force_polling: Whether or not to use a PollingObserver instead of the native observer
     """
-    global kf_obs
+    from watchdog.observers import Observer
+    from watchdog.observers.polling import PollingObserver
+
+    global kf_obs, kf_router
+    _start_kill_worker()
+
     if not kf_obs:
-        kf_obs = Observer()
+        if force_polling:
+            kf_obs = PollingObserver(timeout=poll_interval or _env_kf_poll_interval())
+        else:
+            kf_obs = Observer()
+        atexit.register(stop_kill_observer)
 
-    kfp = KillFilePmeh(kill_cb=callback, patterns=[f"*{kill_filename(app_name)}"])
+    ensure_dir(DEFAULT_KF_DIR)
 
-    try:
-        os.makedirs(DEFAULT_KF_DIR, exist_ok=True)
-    except Exception as e:
-        raise PidFileError(str(e))
+    if not kf_router:
+        kf_router = KillFileRouter()
+        kf_obs.schedule(kf_router, DEFAULT_KF_DIR)
+    kf_router.add_callback(os.path.join(DEFAULT_KF_DIR, kill_filename(app_name)), callback)
 
-    kf_obs.schedule(kfp, DEFAULT_KF_DIR)
-    kf_obs.start()
+    if not kf_obs.is_alive():
+        kf_obs.start()
 
 
 def check_for_process(filename: str):
@@ -179,44 +341,72 @@ def check_for_process(filename: str):
     pid_file = os.path.basename(filename)
     if pid_file.endswith(".pid"):
         pid_file = pid_file[:-4]
+    pid_file_lower = pid_file.lower()
 
-    with open(filename, "r") as f:
-        pid = int(f.read().strip())
+    with open(filename, "rb") as f:
+        pid = int(f.read(16))
 
-    proc = [p for p in list(psutil.process_iter()) if p.pid == pid]
-    if not proc:
+    try:
+        proc = psutil.Process(pid)
+    except psutil.NoSuchProcess:
         raise PidFileStaleError(f"PID File {pid_file} exists but appears stale.")
 
-    proc = proc[0]
-    if "python.exe" in proc.name() and len(proc.cmdline()) > 1:
-        if pid_file == os.path.basename(proc.cmdline()[1]):
-            raise PidFileAlreadyRunningError
-    else:
-        if pid_file == proc.name():
-            raise PidFileAlreadyRunningError
+    with proc.oneshot():
+        name = proc.name().lower()
+        # only interpreters need their command line inspected; skip the expensive cmdline() read for everything else
+        cmdline = proc.cmdline() if "python" in name else None
 
-    raise PidFileStaleError("PID File {pid_file} exists but appears stale.")
+    running_name = os.path.basename(cmdline[1]).lower() if cmdline and len(cmdline) > 1 else name
+    if pid_file_lower == running_name:
+        raise PidFileAlreadyRunningError
+    raise PidFileStaleError(f"PID File {pid_file} exists but appears stale.")
 
 
 def remove_xid_file(filename: str):
     """
-    Calls unlink with some additional error checking (isfile(), etc).  Generally intended for use by the atexit handler
+    Calls unlink, ignoring files that are already gone.  Generally intended for use by the atexit handler
     :param filename: Path to the PID File
     """
-    if os.path.isfile(filename):
-        try:
-            os.unlink(filename)
-        except PermissionError as e:
-            logging.warning(f"Could not delete PID file {filename}. {e}")
+    try:
+        os.unlink(filename)
+    except FileNotFoundError:
+        pass
+    except PermissionError as e:
+        logging.warning(f"Could not delete PID file {filename}. {e}")
 
 
-def atexit_handler(filename: str):
+def register_xid_file(filename: str):
     """
-    Actions to be performed at termination time.  For example, deleting the PID file.
-    :param filename: path to the pid file
+    Marks a PID or kill file for removal at termination time.  The atexit handler is only registered once no matter how
+    many files are added.
+    :param filename: path to the pid or kill file
     """
-    global kf_obs
+    if not _registered_files:
+        atexit.register(atexit_handler)
+    _registered_files.add(filename)
+
+
+def stop_kill_observer():
+    """
+    Stops the kill file observer thread and waits briefly for it to finish.  Called once at termination time.
+    """
+    global kf_obs, kf_router
     if kf_obs:
         kf_obs.stop()
-    remove_xid_file(filename)
+        if kf_obs.is_alive():
+            kf_obs.join(timeout=1.0)
+        kf_obs = None
+        kf_router = None
+
+
+def atexit_handler(filename: str = None):
+    """
+    Actions to be performed at termination time.  For example, deleting the PID file.
+    :param filename: path to the pid file.  If None, every file passed to register_xid_file is removed.
+    """
+    if filename:
+        remove_xid_file(filename)
+        return
 
+    while _registered_files:
+        remove_xid_file(_registered_files.pop())
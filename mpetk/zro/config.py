@@ -8,15 +8,41 @@ Config file reading/writing module.
 
 """
 
+import copy
 import json
 import os
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+PORT_KINDS = ("pub_port", "rep_port", "push_port", "pull_port")
 
 EMPTY_CONFIG = {
     "devices": [],
     "system": {},
     }
 
+def _loads(data):
+    """
+    Parses JSON bytes, with orjson when it is installed.  orjson rejects a few
+        things the json module accepts (NaN, Infinity), so those files fall
+        back to json.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+# path -> ((mtime_ns, size), parsed config) so unchanged files are only parsed
+#   once per process
+_CONFIG_CACHE = {}
+
 
 class ConfigFile(object):
     """
@@ -39,6 +65,23 @@ class ConfigFile(object):
         self.config = self.load_json(path)
         self.save = self.save_json
 
+    def _taken(self):
+        """
+        Scans the configured devices once for the lowercase names and the
+            (ip, port kind, port) entries already in use.  get_devices() hands
+            out the live list, which callers may edit in place, so nothing is
+            cached between calls.
+
+        Returns:
+            tuple: (set of lowercase names, set of occupied port entries)
+
+        """
+        devices = self.config['devices']
+        names = {d['name'].lower() for d in devices}
+        occupied = {(d['ip'], kind, d.get(kind)) for d in devices
+                    for kind in PORT_KINDS}
+        return names, occupied
+
     def load_json(self, json_path):
         """
         Loads a config file at a specified path.  If one doesn't exist, it
@@ -62,10 +105,17 @@ class ConfigFile(object):
         if not os.path.isfile(json_path):
             self.save_json(json_path, EMPTY_CONFIG)
 
-        with open(json_path, "r") as f:
-            config = json.load(f)
+        st = os.stat(json_path)
+        cache_key = os.path.abspath(json_path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached_stamp, cached = _CONFIG_CACHE.get(cache_key, (None, None))
+        if cached_stamp != stamp:
+            with open(json_path, "rb") as f:
+                cached = _loads(f.read())
+            _CONFIG_CACHE[cache_key] = (stamp, cached)
 
-        return config
+        # callers are free to modify the config they are handed
+        return copy.deepcopy(cached)
 
     def save_json(self, json_path="", config=None):
         """
@@ -88,11 +138,22 @@ class ConfigFile(object):
         if dirname:
             if not os.path.isdir(dirname):
                 os.makedirs(dirname)
-        with open(json_path, "w") as f:
-            if not config:
-                config = self.config
-            json.dump(config, f, sort_keys=True,
-                      indent=4, separators=(",", ": "))
+        if not config:
+            config = self.config
+        # write next to the destination and move it into place so a crash
+        #   mid-write never leaves a truncated config behind
+        tmp_path = json_path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(config, f, sort_keys=True,
+                          indent=4, separators=(",", ": "))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, json_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
 
     def add_device(self,
                    name,
@@ -117,32 +178,23 @@ class ConfigFile(object):
 
         """
         # check for conflicts first
-        # TODO: make this not filthy
-        # HOLD MY BEER
-        for dev in self.config['devices']:
-            if name.lower() == dev['name'].lower():
-                raise KeyError("Name %s already exists!" % name)
-            if ip == dev["ip"]:
-                if (pub_port is not None) and (pub_port == dev['pub_port']):
-                    raise ValueError("Pub port %s:%s already in use." % (ip,
-                                                                     pub_port))
-                elif rep_port == dev['rep_port']:
-                    raise ValueError("Rep port %s:%s already in use." % (ip,
-                                                                     rep_port))
-                elif (push_port is not None) and (push_port == dev['push_port']):
-                    raise ValueError("Push port %s:%s already in use." % (ip,
-                                                                     push_port))
-                elif (pull_port is not None) and (pull_port == dev['pull_port']):
-                    raise ValueError("Pull port %s:%s already in use." % (ip,
-                                                                     pull_port))
-
-        self.config['devices'].append({"ip": ip,
-                                       "name": name,
-                                       "pub_port": pub_port,
-                                       "rep_port": rep_port,
-                                       "push_port": push_port,
-                                       "pull_port": pull_port,
-                                       })
+        names, occupied = self._taken()
+        if name.lower() in names:
+            raise KeyError("Name %s already exists!" % name)
+        ports = {"pub_port": pub_port,
+                 "rep_port": rep_port,
+                 "push_port": push_port,
+                 "pull_port": pull_port,
+                 }
+        for kind in PORT_KINDS:
+            port = ports[kind]
+            # rep_port is required, so it is checked even when it is None
+            if (port is not None or kind == "rep_port") and \
+                    (ip, kind, port) in occupied:
+                raise ValueError("%s port %s:%s already in use." % (
+                    kind[:-5].capitalize(), ip, port))
+
+        self.config['devices'].append(dict(ip=ip, name=name, **ports))
 
     def remove_device(self, name):
         """
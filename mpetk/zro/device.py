@@ -27,6 +27,11 @@ try:
 except ImportError:
     raise ImportError("Error importing pyzmq.  Try pip install pyzmq==14.7")
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 ioloop.install()
 ioloop_instance = ioloop.IOLoop.instance()
 
@@ -63,6 +68,7 @@ class RemoteObject(object):
         "set": "_set",
         "get": "_get",
         "run": "_run",
+        "dir": "_dir",
     }
 
     def __init__(self,
@@ -433,12 +439,11 @@ class RemoteObject(object):
         """
         Sends the result of an async call to a destination defined in
             `_async_callbacks`.
-        TODO: don't use exec
         """
         for destination in self._async_callbacks[async_callback_name]:
             addr, method = destination
             p = Proxy(addr)
-            exec("p.{}(result)".format(method))
+            getattr(p, method)(result)
 
     def get_async_result(self, handle, clear_data=True):
         """
@@ -684,6 +689,17 @@ class RemoteObject(object):
 
         return attributes
 
+    def _dir(self):
+        """
+        Returns the public attributes and methods in one response, for
+            `DeviceProxy.__dir__`.
+
+        Returns:
+            dict: {"attributes": [...], "commands": [...]}
+        """
+        return {"attributes": self.get_attribute_list(),
+                "commands": self.get_command_list()}
+
     def _getAttributeNames(self):
         """
         Required for ipython autocomlete to work.
@@ -724,6 +740,11 @@ class BasePubRepDevice(RemoteObject):
         ip (str): IP address to broadcast on.
         pub_port (int): Port to PUB on.
         rep_port (int): Port to REP on.
+        hwm (int): Outgoing high water mark for the publish socket.
+        pub_serialization (str): "pickle", "json" or "orjson".  "orjson"
+            encodes with orjson, if it is installed.  Unlike "json" it writes
+            NaN and Infinity as null and can't encode integers wider than 64
+            bits.
 
     Example:
         >>> bprd = BasePubRepDevice("*", 5555, 5556)
@@ -769,8 +790,14 @@ class BasePubRepDevice(RemoteObject):
             self.__pub_func = self._pub_sock.send_pyobj
         elif self._pub_serialization in ['json', 'j']:
             self.__pub_func = self._pub_sock.send_json
+        elif self._pub_serialization == 'orjson':
+            if orjson is None:
+                raise ValueError("orjson serialization requires the orjson package.")
+            pub_sock = self._pub_sock
+            self.__pub_func = lambda obj: pub_sock.send(
+                orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS))
         else:
-            raise ValueError("Invalid serialization type. Try 'pickle' or 'json'")
+            raise ValueError("Invalid serialization type. Try 'pickle', 'json' or 'orjson'")
 
         if not addr_str.endswith(":None"):
             self._pub_sock.bind(addr_str)
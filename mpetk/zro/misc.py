@@ -4,6 +4,7 @@ misc.py
 Miscellaneous functions.
 
 """
+import functools
 import socket
 
 def get_address(ip="", port=None):
@@ -26,25 +27,29 @@ def get_address(ip="", port=None):
     if not ip and not port:
         raise ValueError("Need a port or IP.")
     elif not ip and port:
-        return "tcp://*:{}".format(port)
+        return f"tcp://*:{port}"
     else:
-        if ip[:6] != "tcp://":
-            ip = "tcp://"+ip
-        if len(ip.split(":")) == 2:
-            return "{}:{}".format(ip, port)
+        if not ip.startswith("tcp://"):
+            ip = "tcp://" + ip
+        if ip.count(":") == 1:
+            # RemoteObject.set_reply_ip relies on a missing port coming back as
+            #   ":None" to pick a random port
+            return f"{ip}:{port}"
         else:
             return ip
 
 def is_valid_ipv4_address(address):
+    # anything but a string is invalid; checking first also keeps unhashable
+    #   input away from the cache
+    if not isinstance(address, str):
+        return False
+    return _is_valid_ipv4_str(address)
+
+@functools.lru_cache(maxsize=256)
+def _is_valid_ipv4_str(address):
     try:
         socket.inet_pton(socket.AF_INET, address)
-    except AttributeError:  # no inet_pton here, sorry
-        try:
-            socket.inet_aton(address)
-        except socket.error:
-            return False
-        return address.count('.') == 3
-    except socket.error:  # not a valid address
+    except (OSError, ValueError):  # not a valid address
         return False
     return True
 
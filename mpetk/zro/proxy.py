@@ -17,13 +17,27 @@ have to create them by ip address.
 """
 import time
 import datetime
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 import zmq
 
-from .config import ConfigFile
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .config import ConfigFile, _loads
 from .error import ZroError
 from .misc import get_address
 
+# idle REQ sockets by address, reused by new DeviceProxy instances so that
+#   short-lived proxies don't reconnect to the same device every time
+_SOCKET_POOL = defaultdict(list)
+_SOCKET_POOL_LOCK = threading.Lock()
+_SOCKET_POOL_SIZE = 8
+
 
 class DeviceManager(object):
     """
@@ -44,6 +58,10 @@ class DeviceManager(object):
         True
 
     """
+    # seconds that platform info and uptime replies are reused
+    _PLATFORM_INFO_TTL = 60.0
+    _UPTIME_TTL = 5.0
+
     def __init__(self, config):
         if isinstance(config, str):
             self.config = ConfigFile(config).get_config()
@@ -55,6 +73,43 @@ class DeviceManager(object):
             raise TypeError("Config file should be file path or dictionary.")
 
         self.devices = self.config['devices']
+        self._platform_info_cache = {}
+        self._uptime_cache = {}
+
+    def invalidate(self, device_name=None):
+        """
+        Drops cached platform info and uptime so the next request goes to the
+            device.
+
+        Args:
+            device_name (Optional[str]): device to invalidate.  Defaults to
+                all devices.
+        """
+        if device_name is None:
+            self._platform_info_cache.clear()
+            self._uptime_cache.clear()
+        else:
+            self._platform_info_cache.pop(device_name.lower(), None)
+            self._uptime_cache.pop(device_name.lower(), None)
+
+    def _find_device(self, device_name):
+        """
+        Looks up a device by case-insensitive name.  The device list is
+            shared with the ConfigFile it came from and can be edited in
+            place, so it is searched on every call rather than indexed.
+
+        Args:
+            device_name (str): name of device in configuration.
+
+        Returns:
+            dict: device information, or None if there is no such device.
+
+        """
+        name = device_name.lower()
+        for dev in self.devices:
+            if dev['name'].lower() == name:
+                return dev
+        return None
 
     def get_device_info(self, device_name):
         """
@@ -67,10 +122,10 @@ class DeviceManager(object):
             dict: dictionary of device information.
 
         """
-        for dev in self.devices:
-            if dev['name'].lower() == device_name.lower():
-                return dev
-        raise KeyError("Device '%s' not found in config." % device_name)
+        dev = self._find_device(device_name)
+        if dev is None:
+            raise KeyError("Device '%s' not found in config." % device_name)
+        return dev
 
     def get_devices(self, ip="*", name=""):
         """
@@ -111,10 +166,7 @@ class DeviceManager(object):
         Returns:
             bool: True if device is in configuration.
         """
-        for dev in self.devices:
-            if dev['name'].lower() == device_name.lower():
-                return True
-        return False
+        return self._find_device(device_name) is not None
 
     def device_active(self, device_name, timeout=3.0):
         """
@@ -135,7 +187,9 @@ class DeviceManager(object):
         if self.device_exists(device_name):
             prox = self.get_proxy(device_name, timeout=timeout)
             try:
-                p = prox.rep_port
+                # rep_port is also stored locally, so go through __getattr__ to
+                #   force the round trip to the device
+                p = prox.__getattr__('rep_port')
                 return True
             except zmq.ZMQError:
                 return False
@@ -165,38 +219,46 @@ class DeviceManager(object):
             times = []
             for i in range(attempts):
                 try:
-                    t = time.clock()
-                    p = prox.rep_port
-                    times.append(time.clock()-t)
+                    t = time.perf_counter_ns()
+                    # rep_port is also stored locally, so go through __getattr__ to
+                    #   force the round trip to the device
+                    p = prox.__getattr__('rep_port')
+                    times.append(time.perf_counter_ns()-t)
                 except zmq.ZMQError:
                     failures += 1
             if failures == attempts:
                 return -1.0
             else:
-                return sum(times)/len(times)
+                return sum(times)/len(times)/1e9
         else:
             raise KeyError("Device %s not in config." % device_name)
 
-    def ping_all_devices(self, timeout=3.0, attempts=3):
+    def ping_all_devices(self, timeout=3.0, attempts=3, max_workers=32):
         """
-        Pings all devices.
+        Pings all devices.  Devices are pinged concurrently, each through its
+            own proxy, so unresponsive devices don't delay the others.
 
         Args:
             timeout (float): timeout for pings in seconds
             attempts (int): # of attempts for each device
+            max_workers (Optional[int]): maximum number of devices pinged at
+                once.  Defaults to 32.
 
         Returns:
             dict: {device_name: ping, ...}
 
         """
-        pings = {}
-        for dev_name in self.get_device_names():
-            pings[dev_name] = self.ping_device(dev_name, timeout, attempts)
-        return pings
+        names = self.get_device_names()
+        if not names:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(names))) as executor:
+            pings = executor.map(lambda name: self.ping_device(name, timeout, attempts), names)
+            return dict(zip(names, pings))
 
     def get_uptime(self, device_name, timeout=3.0, convert_to_datetime=True):
         """
-        Gets the uptime of the device in seconds.
+        Gets the uptime of the device in seconds.  For `_UPTIME_TTL` seconds
+            after a reply, uptime is extrapolated from it locally.
 
         Args:
             device_name (str): name of device to request uptime from.
@@ -213,17 +275,29 @@ class DeviceManager(object):
 
         """
         if self.device_exists(device_name):
-            prox = self.get_proxy(device_name, timeout=timeout)
+            key = device_name.lower()
+            cached = self._uptime_cache.get(key)
+            now = time.monotonic()
+            if cached and now - cached[0] < self._UPTIME_TTL:
+                uptime = cached[1] + (now - cached[0])
+            else:
+                prox = self.get_proxy(device_name, timeout=timeout)
+                if convert_to_datetime:
+                    uptime = prox.get_uptime()
+                else:
+                    uptime = prox.uptime
+                self._uptime_cache[key] = (time.monotonic(), uptime)
             if convert_to_datetime:
-                return datetime.timedelta(seconds=prox.get_uptime())
+                return datetime.timedelta(seconds=uptime)
             else:
-                return prox.uptime
+                return uptime
         else:
             raise KeyError("Device %s not in config." % device_name)
 
     def get_platform_info(self, device_name, timeout=3.0):
         """
-        Gets the platform info of the device.
+        Gets the platform info of the device.  Replies are reused for
+            `_PLATFORM_INFO_TTL` seconds.
 
         Args:
             device_name (str): name of device to get platform info
@@ -238,8 +312,14 @@ class DeviceManager(object):
 
         """
         if self.device_exists(device_name):
+            key = device_name.lower()
+            cached = self._platform_info_cache.get(key)
+            if cached and time.monotonic() - cached[0] < self._PLATFORM_INFO_TTL:
+                return cached[1]
             prox = self.get_proxy(device_name, timeout=timeout)
-            return prox.platform_info
+            platform_info = prox.platform_info
+            self._platform_info_cache[key] = (time.monotonic(), platform_info)
+            return platform_info
         else:
             raise KeyError("Device %s not in config." % device_name)
 
@@ -272,8 +352,11 @@ class DeviceProxy(object):
             in IP.
         timeout (Optional[float]): Timeout in seconds for all commands.
             Defaults to 10.
-        serialization (Optional[str]): Serialization method.  "pickle" (default)
-            or "json".
+        serialization (Optional[str]): Serialization method.  "pickle" (default),
+            "json" or "orjson".  "orjson" speaks JSON like "json" but encodes
+            and decodes with orjson, if it is installed.  It sends NaN and
+            Infinity as null and can't send integers wider than 64 bits;
+            replies orjson can't parse are decoded with json instead.
 
     Example:
         >>> dev = DeviceProxy("localhost:5556")
@@ -281,8 +364,11 @@ class DeviceProxy(object):
         >>> dev.attr_on_device = 5
 
     """
-    _context = zmq.Context()
-    _context.setsockopt(zmq.LINGER, 1)
+    # shared with the rest of the process.  Its settings belong to the
+    #   application, so they are left alone here.
+    _context = zmq.Context.instance()
+    # seconds that a dir() listing of the remote object is reused
+    _DIR_CACHE_TTL = 5.0
 
     def __init__(self,
                  ip="localhost",
@@ -305,9 +391,7 @@ class DeviceProxy(object):
         Overwrite __setattr__ so that attributes are set on target object
             instead of this object.
         """
-        packet = {"command": "set", "args": (name, value)}
-        self._send_packet(packet)
-        response = self.__dict__['recv']()
+        response = self._request({"command": "set", "args": (name, value)})
         if response == "0":
             return None
         else:
@@ -318,9 +402,7 @@ class DeviceProxy(object):
         Overwrite __getattr__ so that attributes are grabbed from target object
             instead of this object.
         """
-        packet = {"command": "get", "args": (name,)}
-        self._send_packet(packet)
-        response = self.__dict__['recv']()
+        response = self._request({"command": "get", "args": (name,)})
         if isinstance(response, ZroError):
             raise ZroError(message=str(response))
         elif response in ('callable', "__callable__"):
@@ -332,13 +414,32 @@ class DeviceProxy(object):
     def __dir__(self):
         """
         Overwrite __dir__ so that attributes and methods come from target
-            object.
+            object.  The listing is fetched in one request and reused for
+            `_DIR_CACHE_TTL` seconds.
         """
-        self.__dict__['to_call'] = "get_attribute_list"
-        attrs = self._call()
-        self.__dict__['to_call'] = "get_command_list"
-        methods = self._call()
-        return attrs + methods
+        cached = self.__dict__.get('dir_cache')
+        if cached and time.monotonic() - cached[0] < self._DIR_CACHE_TTL:
+            return list(cached[1])
+
+        response = self._request({"command": "dir", "args": ()})
+        if isinstance(response, dict) and not response.get('ZroError', False):
+            names = response['attributes'] + response['commands']
+        else:
+            # devices older than the "dir" command reply with an error
+            self.__dict__['to_call'] = "get_attribute_list"
+            attrs = self._call()
+            self.__dict__['to_call'] = "get_command_list"
+            methods = self._call()
+            names = attrs + methods
+        self.__dict__['dir_cache'] = (time.monotonic(), names)
+        return list(names)
+
+    def _request(self, packet):
+        """
+        Sends a packet and returns the device's response.
+        """
+        self._send_packet(packet)
+        return self.__dict__['recv']()
 
     def _send_packet(self, packet):
         """
@@ -346,12 +447,13 @@ class DeviceProxy(object):
 
         #TODO: Make packet a class.
         """
+        d = self.__dict__
         try:
-            self.__dict__['send'](packet)
+            d['send'](packet)
         except zmq.ZMQError:
-            self.__dict__['req_socket'].close()
+            d['req_socket'].close()
             self._setup_socket()
-            self.__dict__['send'](packet)
+            d['send'](packet)
 
     def _setup_socket(self):
         """
@@ -361,39 +463,73 @@ class DeviceProxy(object):
         rep_port = self.__dict__['rep_port']
         addr_str = get_address(ip, rep_port)
         timeout = self.__dict__['timeout']
-        self.__dict__['req_socket'] = self._context.socket(zmq.REQ)
-        self.__dict__['req_socket'].setsockopt(zmq.SNDTIMEO, int(timeout*1000))
-        self.__dict__['req_socket'].setsockopt(zmq.RCVTIMEO, int(timeout*1000))
-        self.__dict__['req_socket'].connect(addr_str)
-
-        if self.__dict__['serialization'] in ["pickle", "pkl", "p"]:
-            self.__dict__['send'] = self.__dict__['req_socket'].send_pyobj
-            self.__dict__['recv'] = self.__dict__['req_socket'].recv_pyobj
-        elif self.__dict__['serialization'] in ["json", "j"]:
-            self.__dict__['send'] = self.__dict__['req_socket'].send_json
-            self.__dict__['recv'] = self.__dict__['req_socket'].recv_json
+        self.__dict__['addr_str'] = addr_str
+        with _SOCKET_POOL_LOCK:
+            pooled = _SOCKET_POOL[addr_str]
+            req_socket = pooled.pop() if pooled else None
+        if req_socket is None:
+            req_socket = self._context.socket(zmq.REQ)
+            req_socket.setsockopt(zmq.LINGER, 1)
+            req_socket.connect(addr_str)
+        req_socket.setsockopt(zmq.SNDTIMEO, int(timeout*1000))
+        req_socket.setsockopt(zmq.RCVTIMEO, int(timeout*1000))
+        self.__dict__['req_socket'] = req_socket
+
+        serialization = self.__dict__['serialization']
+        if serialization in ["pickle", "pkl", "p"]:
+            self.__dict__['send'] = req_socket.send_pyobj
+            self.__dict__['recv'] = req_socket.recv_pyobj
+        elif serialization in ["json", "j"]:
+            self.__dict__['send'] = req_socket.send_json
+            self.__dict__['recv'] = req_socket.recv_json
+        elif serialization == "orjson":
+            if orjson is None:
+                raise ValueError("orjson serialization requires the orjson package.")
+            self.__dict__['send'] = lambda obj, flags=0: req_socket.send(orjson.dumps(obj), flags)
+            self.__dict__['recv'] = lambda flags=0: _loads(req_socket.recv(flags))
         else:
-            raise ValueError("Incorrect serialization type. Try 'pickle' or 'json'.")
+            raise ValueError("Incorrect serialization type. Try 'pickle', 'json' or 'orjson'.")
 
     def _call(self, *args, **kwargs):
         """
         Used for calling arbitrary methods in the device.
         """
-        packet = {"command": "run", "callable": self.to_call, "args": args,
-                  "kwargs": kwargs}
-        self.__dict__['send'](packet)
-        response = self.__dict__['recv']()
+        packet = {"command": "run", "callable": self.__dict__['to_call'],
+                  "args": args, "kwargs": kwargs}
+        response = self._request(packet)
         if isinstance(response, dict) and response.get('ZroError', False):
             response = ZroError.from_dict(response)
         if isinstance(response, ZroError):
             raise ZroError(message=str(response))
         return response
 
+    def _release_socket(self):
+        """
+        Returns the request socket to the pool if it is idle and the pool has
+            room, otherwise closes it.  A socket that is still waiting on a
+            reply (after a timeout) can't send, so it is never pooled.
+        """
+        req_socket = self.__dict__.get('req_socket')
+        if req_socket is None or req_socket.closed:
+            return
+        self.__dict__['req_socket'] = None
+        try:
+            idle = bool(req_socket.getsockopt(zmq.EVENTS) & zmq.POLLOUT)
+        except zmq.ZMQError:
+            idle = False
+        if idle:
+            with _SOCKET_POOL_LOCK:
+                pooled = _SOCKET_POOL[self.__dict__['addr_str']]
+                if len(pooled) < _SOCKET_POOL_SIZE:
+                    pooled.append(req_socket)
+                    return
+        req_socket.close()
+
     def __del__(self):
         """
-        Close the socket on cleanup.
+        Release the socket on cleanup.
         """
-        self.__dict__['req_socket'].close()
+        self._release_socket()
 
 
 Proxy = DeviceProxy
@@ -7,11 +7,15 @@ SUPER OUTDATED
 """
 
 from __future__ import print_function
+import functools
 import logging
 import os
+import random
 import time
 import datetime
 import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import zmq
 
@@ -19,6 +23,57 @@ from device import BasePubRepDevice
 from proxy import DeviceProxy
 from config import ConfigFile
 
+_CLEAR_SCREEN = "\x1b[H\x1b[2J"
+
+
+@functools.lru_cache(maxsize=1)
+def _local_ip():
+    """
+    Resolves this host's IP once per process.  A misconfigured DNS can stall
+        the lookup for seconds.
+    """
+    try:
+        return socket.gethostbyname(socket.gethostname())
+    except socket.gaierror:
+        return "127.0.0.1"
+
+
+@functools.lru_cache(maxsize=128)
+def _fmt_td(total_sec):
+    """
+    Formats a whole number of seconds like str(datetime.timedelta).
+    """
+    return str(datetime.timedelta(seconds=total_sec))
+
+
+def _timed_ping(connection):
+    """
+    Pings a device and returns (monotonic time the ping completed, response).
+        The time is taken in the worker so a cached response ages from when
+        the device answered, not from when its result was collected.
+    """
+    response = connection.ping()
+    return time.monotonic(), response
+
+
+def _enable_vt_mode():
+    """
+    Lets the Windows console interpret ANSI escape sequences.  Other
+        terminals already do.
+    """
+    if os.name != "nt":
+        return
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+            kernel32.SetConsoleMode(handle, mode.value | 0x0004)
+    except Exception as e:
+        logging.debug("Couldn't enable VT mode: {}".format(e))
+
 
 class SystemStatus(BasePubRepDevice):
     """
@@ -31,10 +86,16 @@ class SystemStatus(BasePubRepDevice):
         "system": {},
     }
 
-    def __init__(self, ip, pub_port, rep_port, config_json):
+    _status_row = "%-5s%-15s%-15s%-10s%-10s%-15s%-10s%-20s\n"
+    _status_header = _status_row % ("i", "name", "ip", "rep_port", "pub_port",
+                                    "available", "ping", "uptime")
+
+    def __init__(self, ip, pub_port, rep_port, config_json,
+                 pub_serialization='pickle', ping_ttl=None):
         logging.info("Initializing BasePubRepDevice.")
         super(SystemStatus, self).__init__(ip=ip, pub_port=pub_port,
-                                           rep_port=rep_port)
+                                           rep_port=rep_port,
+                                           pub_serialization=pub_serialization)
         self.config_json = config_json
 
         self.devices = []
@@ -44,15 +105,22 @@ class SystemStatus(BasePubRepDevice):
                       "available": True,
                       "pub_port": pub_port,
                       "rep_port": rep_port,
-                      "ip": socket.gethostbyname(socket.gethostname()),
+                      "ip": _local_ip(),
                       "ping": 0.0,
                       "uptime": 0.0,
                       }
 
         self._setup(self.config)
+        self._pool = self._make_pool()
 
         self._update_count = 0
         self.print_status = True
+        _enable_vt_mode()
+        self.publish_period = 1.0
+        self._next_tick = None
+        # a device whose last ping completed less than ping_ttl seconds ago
+        #   isn't pinged again; its last response is reused.  Off by default.
+        self.ping_ttl = ping_ttl or 0.0
 
         logging.info("Status Device initialized.")
 
@@ -60,9 +128,33 @@ class SystemStatus(BasePubRepDevice):
         devices = config.get_devices()
         #system = config.get_system()
 
+        # snapshot of the device configs, in the same order as self.devices
+        self._devices_cfg = [dev.copy() for dev in devices]
+        # device index -> (monotonic time the ping completed, last successful
+        #   ping response)
+        self._ping_cache = {}
         for dev in devices:
             self._add_device_port(dev)
 
+    def reload_config(self):
+        """
+        Re-reads the config file and reconnects to the devices it lists.
+        """
+        self.config = ConfigFile(self.config_json)
+        self.devices = []
+        self._setup(self.config)
+        # the device count may have changed, so the pool is resized to match
+        self._pool.shutdown(wait=False)
+        self._pool = self._make_pool()
+
+    def _make_pool(self):
+        """
+        Creates the ping pool.  Pings are IO bound, so they run side by side,
+            one worker per device, and a dead device only costs one timeout
+            per cycle.
+        """
+        return ThreadPoolExecutor(max_workers=max(1, min(32, len(self.devices))))
+
     def _add_device_port(self, dev):
         proxy = DeviceConnection(dev)
         self.devices.append(proxy)
@@ -70,64 +162,95 @@ class SystemStatus(BasePubRepDevice):
 
     def _publish(self):
         to_publish = self._get_device_status()
-        self._info['uptime'] = str(datetime.timedelta(seconds=self.get_uptime()))
+        self._info['uptime'] = _fmt_td(int(self.get_uptime()))
         to_publish.insert(0, self._info)
         
         if self.print_status:
             self._show_status(to_publish)
         self._update_count += 1
-        time.sleep(1.0)
+        self._wait_for_next_tick()
         return to_publish
 
+    def _wait_for_next_tick(self):
+        """
+        Sleeps until the next publish deadline so that the time spent pinging
+            counts towards the period instead of adding to it.
+        """
+        now = time.perf_counter()
+        if self._next_tick is None or now - self._next_tick > self.publish_period:
+            # first cycle, or we fell more than a period behind: don't try to
+            #   catch up with a burst of publishes
+            self._next_tick = now
+        self._next_tick += self.publish_period
+        time.sleep(max(0.0, self._next_tick - time.perf_counter()))
+
 
     def _get_device_status(self):
         """
         Gets the status of all configured devices.
         """
-        responses = []
-        for proxy in self.devices:
-            data = proxy.ping()
-            #print(data)
-            responses.append(data)
-        status = []
+        now = time.monotonic()
+        futures = [None] * len(self.devices)
+        responses = [False] * len(futures)
+        for i, proxy in enumerate(self.devices):
+            cached = self._ping_cache.get(i)
+            if cached is not None and now - cached[0] < self.ping_ttl:
+                responses[i] = cached[1]
+            else:
+                futures[i] = self._pool.submit(_timed_ping, proxy)
+        # results are collected in submission order, matching the config order
+        for i, future in enumerate(futures):
+            if future is None:
+                continue
+            try:
+                done_ts, responses[i] = future.result()
+            except Exception as e:
+                logging.warning("Ping failed: {}".format(e))
+            if responses[i] == False:
+                self._ping_cache.pop(i, None)
+            else:
+                self._ping_cache[i] = (done_ts, responses[i])
+        status = [None] * len(responses)
         for i, response in enumerate(responses):
-            device_status = self.config.get_devices()[i].copy()
+            device_status = self._devices_cfg[i].copy()
             if response == False:
                 device_status['available'] = False
                 device_status['ping'] = "*"
                 device_status['uptime'] = "0:00:00:00"
-                try:
-                    #try to reconnect periodically
-                    if self._update_count % 10 == 0:
-                        self.devices[i].connect()
-                except Exception as e:
-                    print(e)
             else:
                 device_status['available'] = True
                 device_status['ping'] = str(response[0])[:5]
-                device_status['uptime'] = str(response[1])
-            status.append(device_status)
+                device_status['uptime'] = _fmt_td(response[1])
+            status[i] = device_status
         return status
 
 
     def _show_status(self, status):
-        form = "{0: ^5}{1: ^15}{2: ^15}{3: ^10}{4: ^10}{5: ^15}{6: ^10}{7: ^20}"
-        header = form.format("i","name","ip","rep_port","pub_port","available",
-                             "ping","uptime")
-        
-        #clear the terminal
-        #print(chr(27) + "[2J")  # linux?
-        os.system("cls")
+        row = self._status_row
+        rows = [row % (i, stat['name'], stat['ip'], stat['rep_port'],
+                       stat['pub_port'], stat['available'],
+                       stat['ping'], stat['uptime'])
+                for i, stat in enumerate(status)]
+        # one write so the screen is redrawn in a single go
+        sys.stdout.write(_CLEAR_SCREEN + self._status_header + "".join(rows))
+        sys.stdout.flush()
 
-        print(header)
-        for i, stat in enumerate(status):
-            print(form.format(i, stat['name'], stat['ip'], stat['rep_port'],
-                              stat['pub_port'], stat['available'],
-                              stat['ping'], stat['uptime']))
+    def _onclose(self):
+        self._pool.shutdown(wait=False)
 
 
 class DeviceConnection(object):
     """ A connection to a device. """
+
+    # seconds between retries of a failing device: doubles after each failed
+    #   attempt up to backoff_max, and is jittered so devices that went down
+    #   together don't all come back together.  While backing off the device
+    #   has no socket at all, so neither we nor zmq touch it.
+    backoff_initial = 1.0
+    backoff_max = 60.0
+    # seconds before a healthy proxy is rotated anyway
+    max_age = 3600.0
+
     def __init__(self, config):
         super(DeviceConnection, self).__init__()
         self.config = config
@@ -135,6 +258,11 @@ class DeviceConnection(object):
         self.ip = config['ip']
         self.rep_port = config['rep_port']
 
+        self.proxy = None
+        self.last_ok_ts = None
+        self.failure_streak = 0
+        self.backoff_s = self.backoff_initial
+        self.next_retry_ts = 0.0
         self.connect()
 
         self.uptime_sec = 0.0
@@ -146,26 +274,69 @@ class DeviceConnection(object):
         self.proxy = DeviceProxy(self.ip,
                                  self.rep_port,
                                  timeout=2.0)
+        self.created_ts = time.monotonic()
+
+    def disconnect(self):
+        """
+        Drops the proxy connection.  Its socket is closed, so zmq stops
+            trying to reconnect to the device in the background.
+        """
+        if self.proxy is not None:
+            self.proxy._release_socket()
+            self.proxy = None
+
+    def _reconnect(self):
+        self.disconnect()
+        try:
+            self.connect()
+        except Exception as e:
+            logging.warning("Failed to reconnect to {}:{}: {}".format(
+                self.ip, self.rep_port, e))
+
+    def _failed(self):
+        """
+        Records a failed ping, drops the connection and schedules the next
+            retry.
+        """
+        self.disconnect()
+        self.failure_streak += 1
+        self.next_retry_ts = time.monotonic() + self.backoff_s * (0.5 + random.random())
+        self.backoff_s = min(self.backoff_max, self.backoff_s * 2)
+        return False
 
     def ping(self):
         """
         Pings a device.  Returns False if device doesn't respond.  If it does
-            respond, returns time and whether is it publishing.
+            respond, returns time and whether is it publishing.  A failing
+            device is reported as unavailable without being contacted until
+            its next retry is due.
         """
-        t = time.clock()
+        if self.proxy is None:
+            if time.monotonic() < self.next_retry_ts:
+                return False
+            self._reconnect()
+            if self.proxy is None:
+                return self._failed()
+        elif time.monotonic() - self.created_ts > self.max_age:
+            self._reconnect()
+        t = time.perf_counter_ns()
         try:
-            rep_port = self.proxy.rep_port
-            return (time.clock()-t, self.uptime())
-        except zmq.ZMQError as e:
-            return False
-        self.ping_counter += 1
+            uptime = self.uptime()
+            result = ((time.perf_counter_ns()-t) * 1e-9, uptime)
+        except zmq.ZMQError:
+            return self._failed()
+        self.failure_streak = 0
+        self.backoff_s = self.backoff_initial
+        self.next_retry_ts = 0.0
+        self.last_ok_ts = time.monotonic()
+        return result
 
     def uptime(self):
         """
-        Gets the devices uptime.
+        Gets the devices uptime in whole seconds.
         """
         self.uptime_sec = self.proxy.get_uptime()
-        return datetime.timedelta(seconds=self.uptime_sec)
+        return int(self.uptime_sec)
         
 
 
@@ -180,10 +351,12 @@ if __name__ == '__main__':
 
     parser.add_argument("-c", "--config", type=str, help="The config file.",
                         default="C:/tmp/status.json")
+    parser.add_argument("--ping-ttl", type=float, default=0.0,
+                        help="Seconds to reuse a device's last ping response.")
 
     args = parser.parse_args()
 
-    sd = SystemStatus("*", 5600, 5601, args.config)
+    sd = SystemStatus("*", 5600, 5601, args.config, ping_ttl=args.ping_ttl)
 
     sd.publishing = True
 
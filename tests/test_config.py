@@ -0,0 +1,156 @@
+import json
+import os
+
+import pytest
+
+from mpetk.zro import config as config_module
+from mpetk.zro.config import ConfigFile
+from mpetk.zro.proxy import DeviceManager
+
+
+@pytest.fixture
+def cfg(tmp_path):
+    return ConfigFile(str(tmp_path / "devices.json"))
+
+
+def test_load_json_parses_unchanged_file_once(tmp_path, monkeypatch):
+    path = str(tmp_path / "cached.json")
+    ConfigFile(path)
+    reads = []
+
+    def counting_open(file, mode="r", *args, **kwargs):
+        if "r" in mode:
+            reads.append(file)
+        return open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr(config_module, "open", counting_open, raising=False)
+
+    first = ConfigFile(path)
+    second = ConfigFile(path)
+    assert reads == []
+    first.set_system_var("x", 1)
+    assert second.get_system() == {}
+
+
+def test_load_json_rereads_changed_file(tmp_path):
+    path = str(tmp_path / "changed.json")
+    ConfigFile(path).get_config()
+    writer = ConfigFile(path)
+    writer.add_device("a", "10.0.0.1", 5000)
+    writer.save()
+    assert ConfigFile(path).get_device_names() == ["a"]
+
+
+def test_add_device_rejects_duplicate_name_any_case(cfg):
+    cfg.add_device("Stage", "10.0.0.1", 5000)
+    with pytest.raises(KeyError):
+        cfg.add_device("stage", "10.0.0.2", 5001)
+
+
+def test_remove_device_any_case(cfg):
+    cfg.add_device("Stage", "10.0.0.1", 5000)
+    cfg.remove_device("STAGE")
+    assert cfg.get_devices() == []
+
+
+def test_remove_missing_device_raises(cfg):
+    with pytest.raises(KeyError):
+        cfg.remove_device("nope")
+
+
+def test_device_manager_dict_config_lookup():
+    dm = DeviceManager({"devices": [{"name": "Stage", "ip": "10.0.0.1", "rep_port": 5000}], "system": {}})
+    assert dm.device_exists("stage")
+    dm.devices.append({"name": "camera", "ip": "10.0.0.1", "rep_port": 5001})
+    assert dm.get_device_info("Camera")["rep_port"] == 5001
+
+
+@pytest.mark.parametrize("kind", ["rep_port", "pub_port", "push_port", "pull_port"])
+def test_add_device_rejects_same_port_kind_on_same_ip(cfg, kind):
+    ports = dict(rep_port=5000, pub_port=5001, push_port=5002, pull_port=5003)
+    cfg.add_device("a", "10.0.0.1", **ports)
+    other = dict(rep_port=6000, pub_port=6001, push_port=6002, pull_port=6003)
+    other[kind] = ports[kind]
+    with pytest.raises(ValueError, match="already in use"):
+        cfg.add_device("b", "10.0.0.1", **other)
+
+
+def test_add_device_allows_same_port_on_other_ip_or_kind(cfg):
+    cfg.add_device("a", "10.0.0.1", 5000, pub_port=5001)
+    cfg.add_device("b", "10.0.0.2", 5000, pub_port=5001)
+    cfg.add_device("c", "10.0.0.1", 5001, pub_port=5000)
+    assert cfg.get_device_names() == ["a", "b", "c"]
+
+
+def test_add_device_ignores_unset_optional_ports(cfg):
+    cfg.add_device("a", "10.0.0.1", 5000)
+    cfg.add_device("b", "10.0.0.1", 5001)
+    assert len(cfg.get_devices()) == 2
+
+
+def test_removed_device_frees_its_ports(cfg):
+    cfg.add_device("a", "10.0.0.1", 5000)
+    cfg.remove_device("A")
+    cfg.add_device("b", "10.0.0.1", 5000)
+    assert cfg.get_device_names() == ["b"]
+
+
+def test_save_json_replaces_file_and_leaves_no_temp(cfg, tmp_path):
+    cfg.add_device("a", "10.0.0.1", 5000)
+    cfg.save()
+    with open(cfg.path) as f:
+        assert json.load(f)["devices"][0]["name"] == "a"
+    assert os.listdir(tmp_path) == ["devices.json"]
+
+
+def test_save_json_failure_keeps_previous_file(cfg, tmp_path):
+    cfg.add_device("a", "10.0.0.1", 5000)
+    cfg.save()
+    with open(cfg.path) as f:
+        before = f.read()
+
+    cfg.set_system_var("bad", object())
+    with pytest.raises(TypeError):
+        cfg.save()
+
+    with open(cfg.path) as f:
+        assert f.read() == before
+    assert os.listdir(tmp_path) == ["devices.json"]
+
+
+def test_device_manager_sees_remove_then_add(cfg):
+    cfg.add_device("a", "10.0.0.1", 5000)
+    cfg.add_device("b", "10.0.0.1", 5001)
+    dm = DeviceManager(cfg)
+    assert dm.device_exists("a")
+
+    cfg.remove_device("a")
+    cfg.add_device("c", "10.0.0.1", 5002)
+
+    assert not dm.device_exists("a")
+    assert dm.device_exists("C")
+    assert dm.get_device_info("c")["rep_port"] == 5002
+    with pytest.raises(KeyError):
+        dm.get_device_info("a")
+
+
+def test_add_device_sees_in_place_edits(cfg):
+    cfg.add_device("a", "10.0.0.1", 5000)
+    cfg.get_devices()[0]["name"] = "renamed"
+    cfg.add_device("a", "10.0.0.2", 6000)
+
+    cfg.get_devices()[0] = dict(ip="10.0.0.3", name="swapped", rep_port=7000,
+                                pub_port=None, push_port=None, pull_port=None)
+    cfg.add_device("renamed", "10.0.0.1", 5000)
+    with pytest.raises(KeyError):
+        cfg.add_device("SWAPPED", "10.0.0.4", 8000)
+    with pytest.raises(ValueError):
+        cfg.add_device("b", "10.0.0.3", 7000)
+
+
+def test_device_manager_sees_in_place_edits(cfg):
+    cfg.add_device("a", "10.0.0.1", 5000)
+    dm = DeviceManager(cfg)
+    cfg.get_devices()[0]["name"] = "renamed"
+    assert not dm.device_exists("a")
+    assert dm.device_exists("Renamed")
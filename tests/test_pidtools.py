@@ -0,0 +1,140 @@
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+import psutil
+import pytest
+
+from mpetk.piddl import pidtools
+
+
+def _read_pid(filename):
+    with open(filename) as f:
+        return int(f.read())
+
+
+def _dead_pid():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def _running_name():
+    # the name check_for_process compares a PID file against for this process
+    proc = psutil.Process()
+    name = proc.name().lower()
+    cmdline = proc.cmdline() if "python" in name else None
+    return os.path.basename(cmdline[1]).lower() if cmdline and len(cmdline) > 1 else name
+
+
+def test_make_pid_file_writes_current_pid(tmp_path):
+    pidtools.make_pid_file("fresh", str(tmp_path))
+    assert _read_pid(tmp_path / "fresh.pid") == os.getpid()
+
+
+def test_make_pid_file_keeps_stale_file_without_clobber(tmp_path):
+    filename = tmp_path / "stale.pid"
+    filename.write_text(str(_dead_pid()))
+    before = filename.read_text()
+
+    with pytest.raises(pidtools.PidFileStaleError):
+        pidtools.make_pid_file("stale", str(tmp_path))
+    assert filename.read_text() == before
+
+
+def test_make_pid_file_clobbers_stale_file(tmp_path):
+    (tmp_path / "clobber.pid").write_text(str(_dead_pid()))
+
+    pidtools.make_pid_file("clobber", str(tmp_path), clobber_stale=True)
+
+    assert _read_pid(tmp_path / "clobber.pid") == os.getpid()
+    assert os.listdir(tmp_path) == ["clobber.pid"]
+
+
+def test_make_pid_file_refuses_running_instance(tmp_path):
+    pid_name = _running_name()
+    (tmp_path / f"{pid_name}.pid").write_text(str(os.getpid()))
+
+    with pytest.raises(pidtools.PidFileAlreadyRunningError):
+        pidtools.make_pid_file(pid_name, str(tmp_path), clobber_stale=True)
+
+
+def test_check_for_process_dead_pid_is_stale(tmp_path):
+    filename = tmp_path / "gone.pid"
+    filename.write_text(str(_dead_pid()))
+    with pytest.raises(pidtools.PidFileStaleError, match="gone"):
+        pidtools.check_for_process(str(filename))
+
+
+def test_check_for_process_other_process_message_names_file(tmp_path):
+    filename = tmp_path / "someotherapp.pid"
+    filename.write_text(str(os.getpid()))
+    with pytest.raises(pidtools.PidFileStaleError) as excinfo:
+        pidtools.check_for_process(str(filename))
+    assert str(excinfo.value) == "PID File someotherapp exists but appears stale."
+
+
+def test_check_for_process_missing_file_returns(tmp_path):
+    assert pidtools.check_for_process(str(tmp_path / "missing.pid")) is None
+
+
+@pytest.fixture
+def kill_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pidtools, "DEFAULT_KF_DIR", str(tmp_path))
+    yield tmp_path
+    pidtools.stop_kill_observer()
+
+
+def test_register_kill_callback_twice(kill_dir):
+    fired = {name: threading.Event() for name in ("first", "second")}
+    pidtools.register_kill_callback(fired["first"].set, app_name="first")
+    pidtools.register_kill_callback(fired["second"].set, app_name="second")
+    time.sleep(0.2)
+
+    (kill_dir / pidtools.kill_filename("second")).write_text("")
+
+    assert fired["second"].wait(5.0)
+    assert not fired["first"].is_set()
+
+
+def test_kill_file_pmeh_scheduled_directly(kill_dir, monkeypatch):
+    from watchdog.observers import Observer
+
+    # as if register_kill_callback had never run in this process
+    monkeypatch.setattr(pidtools, "kf_worker", None)
+    monkeypatch.setattr(pidtools, "_kill_queue", queue.SimpleQueue())
+
+    fired = threading.Event()
+    kill_file = kill_dir / "direct.kill"
+    observer = Observer()
+    observer.schedule(pidtools.KillFilePmeh(kill_cb=fired.set, kill_file=str(kill_file)), str(kill_dir))
+    observer.start()
+    try:
+        time.sleep(0.2)
+        kill_file.write_text("")
+        assert fired.wait(5.0)
+    finally:
+        observer.stop()
+        observer.join()
+
+
+@pytest.mark.parametrize("value, expected", [(None, 10.0), ("2.5", 2.5), ("10s", 10.0)])
+def test_env_kf_poll_interval(monkeypatch, value, expected):
+    if value is None:
+        monkeypatch.delenv("MPE_KF_POLL_INTERVAL", raising=False)
+    else:
+        monkeypatch.setenv("MPE_KF_POLL_INTERVAL", value)
+    assert pidtools._env_kf_poll_interval() == expected
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX permission bits")
+def test_clobbered_pid_file_is_world_readable(tmp_path):
+    (tmp_path / "perms.pid").write_text(str(_dead_pid()))
+    os.chmod(tmp_path / "perms.pid", 0o600)
+
+    pidtools.make_pid_file("perms", str(tmp_path), clobber_stale=True)
+
+    assert os.stat(tmp_path / "perms.pid").st_mode & 0o777 == 0o644
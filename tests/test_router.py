@@ -0,0 +1,69 @@
+import socket
+
+import zmq
+
+from mpetk.aibsmw import aibsmw_messages_pb2 as messages
+from mpetk.aibsmw.routerio.router import Router
+
+
+class FakeRouterSocket(object):
+    """
+    Stands in for the router's ROUTER socket: replays packets, then stops the router.
+    """
+    def __init__(self, router, packets):
+        self.router = router
+        self.packets = list(packets)
+        self.sent = []
+
+    def recv_multipart(self):
+        if not self.packets:
+            self.router.stop()
+            raise zmq.error.Again()
+        return list(self.packets.pop(0))
+
+    def send_multipart(self, packet):
+        self.sent.append(list(packet))
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _run_router(packets):
+    router = Router(port=_free_port())
+    router._router.close()
+    router._router = FakeRouterSocket(router, packets)
+    router.start()
+    return router
+
+
+def _packet(client, message):
+    message_id = message.DESCRIPTOR.name
+    message.header.host = "test"
+    message.header.process = "test"
+    message.header.timestamp = 0.0
+    message.header.message_id = message_id
+    return [client, message_id.encode(), message.SerializeToString()]
+
+
+def test_register_and_fanout():
+    router = _run_router([
+        _packet(b"sub", messages.register_for_message(message_id="some_message")),
+        [b"pub", b"some_message", b"payload"],
+    ])
+    assert router.registration[b"some_message"] == {b"sub"}
+    assert [b"sub", b"some_message", b"payload"] in router._router.sent
+
+
+def test_deregister_removes_client_from_message_id():
+    router = _run_router([
+        _packet(b"sub", messages.register_for_message(message_id="some_message")),
+        _packet(b"other", messages.register_for_message(message_id="some_message")),
+        _packet(b"sub", messages.deregister_for_message(message_id="some_message")),
+        [b"pub", b"some_message", b"payload"],
+    ])
+    assert router.registration[b"some_message"] == {b"other"}
+    recipients = [packet[0] for packet in router._router.sent if packet[1:] == [b"some_message", b"payload"]]
+    assert recipients == [b"other"]
@@ -0,0 +1,15 @@
+from mpetk.aibsmw.routerio import ZRO
+
+
+def test_stamped_packet_leaves_message_untouched():
+    message = ZRO.create_platfom_info_packet()
+    timestamp = message.header.timestamp
+    stamped = ZRO.StampedPacket(message, prefix=b"topic ")
+    assert message.header.timestamp == timestamp
+
+    frame = stamped.stamp(123.5)
+    assert frame.startswith(b"topic ")
+    sent = type(message)()
+    sent.ParseFromString(frame[len(b"topic "):])
+    assert sent.header.timestamp == 123.5
+    assert sent.header.host == message.header.host